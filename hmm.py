@@ -36,12 +36,14 @@ def sampleG(dist):
     return np.random.normal(dist[0],dist[1])
 
 def gaussian(x, mu, sig):
-    return 1.0 / (sig * np.sqrt(2 * np.pi)) * np.exp(-np.power(x - mu, 2.) / (2 * np.power(sig, 2.)))
+    d = x - mu
+    return 1.0 / (sig * np.sqrt(2 * np.pi)) * np.exp(-0.5 * d * d / (sig * sig))
 
 def calcB(hmm, obs):
     b1 = np.ones(hmm.B.shape[2]);
     for i in range(0, hmm.B.shape[0]):
-        b1 *= gaussian(obs[i] * np.ones(hmm.B.shape[2]),hmm.B[i][0],hmm.B[i][1])
+        # the scalar observation broadcasts against the mu/sigma rows
+        b1 *= gaussian(obs[i],hmm.B[i][0],hmm.B[i][1])
     return b1;
 
 def forwardHMM(hmm, obs):
@@ -56,13 +58,18 @@ def forwardHMM(hmm, obs):
     """ 
     f = np.zeros((len(obs[0])+1,len(hmm.pi)))
     f[0] = hmm.pi
-    
+
+    # scratch buffers reused across timesteps instead of reallocating
+    AT = np.ascontiguousarray(hmm.A.T * 1.0)
+    b1 = np.empty(hmm.B.shape[2])
+    dot_out = np.empty(len(hmm.pi))
     for t in range(0,len(obs[0])):
-        b1 = np.ones(hmm.B.shape[2]);
-        for i in range(0, hmm.B.shape[0]):
+        b1[:] = hmm.B[0][obs[0,t]]
+        for i in range(1, hmm.B.shape[0]):
             b1 *= hmm.B[i][obs[i,t]]
-        v = b1 * np.dot((hmm.A.T),f[t])
-        f[t+1] = v / v.sum()
+        np.dot(AT, f[t], out=dot_out)
+        np.multiply(b1, dot_out, out=f[t+1])
+        f[t+1] /= f[t+1].sum()
     return f
 
 def forwardHMMG(hmm, obs):
@@ -77,12 +84,15 @@ def forwardHMMG(hmm, obs):
     """ 
     f = np.zeros((len(obs[0])+1,len(hmm.pi)))
     f[0] = hmm.pi
-    
+
+    AT = np.ascontiguousarray(hmm.A.T * 1.0)
+    dot_out = np.empty(len(hmm.pi))
     for t in range(0,len(obs[0])):
         bs = calcB(hmm,obs[:,t])
-        v = bs * np.dot((hmm.A.T),f[t])
+        np.dot(AT, f[t], out=dot_out)
         #print(str(t) + " hatte bs: " + str(bs) + " hatte f[t]: " + str(f[t])+" hatte v: " + str(v));
-        f[t+1] = v / v.sum()
+        np.multiply(bs, dot_out, out=f[t+1])
+        f[t+1] /= f[t+1].sum()
     return f
 def backwardHMM(hmm, obs):
     """
@@ -92,17 +102,22 @@ def backwardHMM(hmm, obs):
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
 
-    :return b: backward messages (each row represents a time step)
+    :return b: backward messages, normalized per time step (each row
+               represents a time step)
     """
     b = np.zeros((len(obs[0])+1,len(hmm.pi)))
-    b[len(obs[0])] = np.ones(len(hmm.pi)) * 10000000
+    b[len(obs[0])] = np.ones(len(hmm.pi))
 
+    A = np.ascontiguousarray(hmm.A * 1.0)
+    b1 = np.empty(hmm.B.shape[2])
     for t in reversed(range(1,len(obs[0])+1)):
-        b1 = np.ones(hmm.B.shape[2]);
-        for i in range(0, hmm.B.shape[0]):
+        b1[:] = hmm.B[0][obs[0,t-1]]
+        for i in range(1, hmm.B.shape[0]):
             b1 *= hmm.B[i][obs[i,t-1]]
-        b[t-1] = np.dot(hmm.A, (b1).T * b[t])
-        
+        b1 *= b[t]
+        np.dot(A, b1, out=b[t-1])
+        b[t-1] /= b[t-1].sum()
+
     return b
 
 def backwardHMMG(hmm, obs):
@@ -113,16 +128,19 @@ def backwardHMMG(hmm, obs):
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
 
-    :return b: backward messages (each row represents a time step)
+    :return b: backward messages, normalized per time step (each row
+               represents a time step)
     """
     b = np.zeros((len(obs[0])+1,len(hmm.pi)))
-    b[len(obs[0])] = np.ones(len(hmm.pi)) * 10000000
+    b[len(obs[0])] = np.ones(len(hmm.pi))
 
+    A = np.ascontiguousarray(hmm.A * 1.0)
     for t in reversed(range(1,len(obs[0])+1)):
         bs = calcB(hmm,obs[:,t-1])
-        v = np.dot(hmm.A, bs.T * b[t])
-        b[t-1] = v / v.sum()
-        
+        bs *= b[t]
+        np.dot(A, bs, out=b[t-1])
+        b[t-1] /= b[t-1].sum()
+
     return b
 
 def forward_backwardHMM(hmm, obs):
@@ -180,11 +198,14 @@ def viterbiHMM(hmm, observations):
     # best precursor state
     bps = np.empty_like(vs, dtype=int)
     vs[0] = hmm.pi
+    b1 = np.empty(hmm.B.shape[2])
+    tmp = np.empty((hmm.num_states, hmm.num_states))
     for v_prev, v, bp, obs in zip(vs[:-1], vs[1:], bps[1:], observations.T):
-        b1 = np.ones(hmm.B.shape[2]);
-        for i in range(0, hmm.B.shape[0]):
+        b1[:] = hmm.B[0][obs[0]]
+        for i in range(1, hmm.B.shape[0]):
             b1 *= hmm.B[i][obs[i]]
-        tmp = v_prev[:,np.newaxis] * hmm.A * b1
+        np.multiply(v_prev[:,np.newaxis], hmm.A, out=tmp)
+        tmp *= b1
         bp[:] = tmp.argmax(0)
         v[:] = tmp.max(0)
         v /= v.sum()
@@ -213,10 +234,11 @@ def viterbiHMMG(hmm, observations):
     # best precursor state
     bps = np.empty_like(vs, dtype=int)
     vs[0] = hmm.pi
+    tmp = np.empty((hmm.num_states, hmm.num_states))
     for v_prev, v, bp, obs in zip(vs[:-1], vs[1:], bps[1:], observations.T):
-#         bs = hmm.B1[obs[0]] * hmm.B2[obs[1]] * hmm.B3[obs[2]]
         bs = calcB(hmm,obs)
-        tmp = v_prev[:,np.newaxis] * hmm.A * bs
+        np.multiply(v_prev[:,np.newaxis], hmm.A, out=tmp)
+        tmp *= bs
         bp[:] = tmp.argmax(0)
         v[:] = tmp.max(0)
         v /= v.sum()
@@ -0,0 +1,80 @@
+cimport cython
+
+import numpy as np
+
+cimport numpy as np
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[np.double_t, ndim=2] forwardE(double[:] pi, double[:, :] AT, double[:, :] E, np.ndarray[np.double_t, ndim=2] f, double[:] norms):
+#         runs the forward recursion on a precomputed emission matrix
+#
+#         Parameters
+#         ----------
+#         pi: 1D-array initial distribution
+#         AT: 2D-array transposed transition matrix (contiguous)
+#         E:  2D-array [time,stateIndex] emission probabilities
+#         f:  2D-array [time+1,stateIndex] output message buffer
+#         norms: 1D-array [time] output buffer for the per-step normalizers
+#
+#         Returns
+#         -------
+#         f: 2D-array [time,stateIndex] filtering distribution
+
+    cdef double[:, :] fv = f;
+    cdef double acc,s;
+    cdef int t,i,j;
+    cdef int T = E.shape[0];
+    cdef int num_states = pi.shape[0];
+
+    for j in range(num_states):
+        fv[0,j] = pi[j];
+    for t in range(T):
+        s = 0.0;
+        for j in range(num_states):
+            acc = 0.0;
+            for i in range(num_states):
+                acc += AT[j,i] * fv[t,i];
+            fv[t+1,j] = E[t,j] * acc;
+            s += fv[t+1,j];
+        norms[t] = s;
+        for j in range(num_states):
+            fv[t+1,j] /= s;
+    return f
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[np.double_t, ndim=2] backwardE(double[:, :] A, double[:, :] E, np.ndarray[np.double_t, ndim=2] b):
+#         runs the backward recursion on a precomputed emission matrix
+#
+#         Parameters
+#         ----------
+#         A: 2D-array transition matrix (contiguous)
+#         E: 2D-array [time,stateIndex] emission probabilities
+#         b: 2D-array [time+1,stateIndex] output message buffer
+#
+#         Returns
+#         -------
+#         b: 2D-array [time,stateIndex] backward messages, normalized per time step
+
+    cdef double[:, :] bv = b;
+    cdef double acc,s;
+    cdef int t,i,j;
+    cdef int T = E.shape[0];
+    cdef int num_states = A.shape[0];
+
+    for j in range(num_states):
+        bv[T,j] = 1.0;
+    for t in range(T,0,-1):
+        s = 0.0;
+        for i in range(num_states):
+            acc = 0.0;
+            for j in range(num_states):
+                acc += A[i,j] * E[t-1,j] * bv[t,j];
+            bv[t-1,i] = acc;
+            s += acc;
+        for i in range(num_states):
+            bv[t-1,i] /= s;
+    return b
@@ -1,8 +1,35 @@
 import numpy as np
 from numpy import array
+from numba import njit, prange, get_num_threads
+
+try:
+    # ahead-of-time compiled forward/backward kernels, built together with
+    # the other cython extensions (setup.py cythonizes ./marycrf/*.pyx);
+    # when the extension has not been built the numba kernels below are used
+    from marycrf import _hmm_core
+except ImportError:
+    _hmm_core = None
+
+def _array_module(backend):
+    """
+    Resolves a backend name to its array module. cupy and jax are optional
+    dependencies and only imported when their backend is requested.
+
+    :param backend: 'numpy', 'cupy' or 'jax'
+    :returns: the array module
+    """
+    if backend == 'numpy':
+        return np
+    if backend == 'cupy':
+        import cupy
+        return cupy
+    if backend == 'jax':
+        import jax.numpy as jnp
+        return jnp
+    raise ValueError("unknown backend: " + str(backend))
 
 class HMM:
-    def __init__(self, pi, A, B1, B2, B3):
+    def __init__(self, pi, A, B1, B2, B3, backend='numpy', dtype=np.float64):
         """
         Datastructure that holds the probability tables for
         a discrete observation HMM.
@@ -10,14 +37,59 @@ class HMM:
         :param pi: Initial probabilities
         :param A: Transition probabilities
         :param B: Observation probabilities
+        :param backend: array module forwardHMMG/backwardHMMG run on
+                        ('numpy', 'cupy' or 'jax'); all other routines,
+                        including viterbiHMMG and the log/scan/batch
+                        variants, always run the numba kernels on the host
+                        and require the numpy backend
+        :param dtype: storage dtype of the probability tables. float32 halves
+                      the memory traffic of the recursions; the message
+                      accumulators always stay float64
         """
-        self.pi = pi
-        self.A = A
-        self.B1 = B1
-        self.B2 = B2
-        self.B3 = B3
+        self.backend = backend
+        self.xp = _array_module(backend)
+        self.dtype = np.dtype(dtype)
+        xp = self.xp
+        self.pi = xp.asarray(pi, dtype=dtype)
+        self.A = xp.asarray(A, dtype=dtype)
+        # contiguous transpose for the forward recursions, so np.dot(A.T, f)
+        # does not fall back on strided access every step
+        if backend == 'numpy':
+            self.AT = np.ascontiguousarray(np.asarray(A, dtype=dtype).T)
+        else:
+            self.AT = xp.asarray(self.A.T)
+        self.B1 = xp.asarray(B1, dtype=dtype)
+        self.B2 = xp.asarray(B2, dtype=dtype)
+        self.B3 = xp.asarray(B3, dtype=dtype)
         self.num_states = len(pi)
 
+        # CSR copies of the transition matrix for structured models (banded,
+        # left-to-right, ...) where most transitions are impossible; the
+        # forward kernels then skip the zero entries entirely
+        self.A_csr = None
+        self.AT_csr = None
+        if backend == 'numpy' and np.count_nonzero(self.A) < 0.1 * self.A.size:
+            from scipy import sparse
+            self.A_csr = sparse.csr_matrix(self.A)
+            self.AT_csr = sparse.csr_matrix(self.AT)
+
+        # precomputed Gaussian constants (only meaningful for the G variants,
+        # where B holds mu/sigma rows): contiguous mu/sigma plus the
+        # reciprocals that gaussian() would otherwise recompute per call
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mu1, self.sig1 = [xp.asarray(r, dtype=dtype) for r in self.B1[:2]]
+            self.mu2, self.sig2 = [xp.asarray(r, dtype=dtype) for r in self.B2[:2]]
+            self.mu3, self.sig3 = [xp.asarray(r, dtype=dtype) for r in self.B3[:2]]
+            self.inv_sig1 = 1.0 / self.sig1
+            self.inv_sig2 = 1.0 / self.sig2
+            self.inv_sig3 = 1.0 / self.sig3
+            self.inv_2var1 = 0.5 * self.inv_sig1 * self.inv_sig1
+            self.inv_2var2 = 0.5 * self.inv_sig2 * self.inv_sig2
+            self.inv_2var3 = 0.5 * self.inv_sig3 * self.inv_sig3
+            self.norm1 = self.inv_sig1 / np.sqrt(2 * np.pi)
+            self.norm2 = self.inv_sig2 / np.sqrt(2 * np.pi)
+            self.norm3 = self.inv_sig3 / np.sqrt(2 * np.pi)
+
         
 def sample(dist):
     """
@@ -38,49 +110,421 @@ def sampleG(dist):
     return np.random.normal(dist[0],dist[1])
 
 def gaussian(x, mu, sig):
-    return 1.0 / (sig * np.sqrt(2 * np.pi)) * np.exp(-np.power(x - mu, 2.) / (2 * np.power(sig, 2.)))
+    d = x - mu
+    return 1.0 / (sig * np.sqrt(2 * np.pi)) * np.exp(-0.5 * d * d / (sig * sig))
 
 def calcB(hmm, obs):
-    b1 = gaussian(obs[0] * np.ones(hmm.B1.shape[1]),hmm.B1[0],hmm.B1[1])
-    b2 = gaussian(obs[1] * np.ones(hmm.B2.shape[1]),hmm.B2[0],hmm.B2[1])
-    b3 = gaussian(obs[2] * np.ones(hmm.B3.shape[1]),hmm.B3[0],hmm.B3[1])
+    # scalar observations broadcast against the mu rows for free, no need to
+    # expand them into a length-N array first
+    d1 = obs[0] - hmm.mu1
+    d2 = obs[1] - hmm.mu2
+    d3 = obs[2] - hmm.mu3
+    b1 = hmm.norm1 * np.exp(-d1*d1 * hmm.inv_2var1)
+    b2 = hmm.norm2 * np.exp(-d2*d2 * hmm.inv_2var2)
+    b3 = hmm.norm3 * np.exp(-d3*d3 * hmm.inv_2var3)
     return b1 * b2 * b3;
 
-def forwardHMM(hmm, obs):
+def gather_emissions(hmm, obs):
+    """
+    Gathers the discrete emission probabilities for all timesteps in one
+    batched fancy-indexing pass over the observation tables.
+
+    :param hmm: HMM datastructure
+    :param obs: Numpy array containing the observations
+
+    :return E: emission probabilities (each row represents a time step)
+    """
+    return hmm.B1[obs[0]] * hmm.B2[obs[1]] * hmm.B3[obs[2]]
+
+def precompute_log_emissions(hmm, obs):
+    """
+    Computes the Gaussian log emission probabilities for all timesteps in one
+    vectorized pass, replacing the per-timestep calcB calls.
+
+    :param hmm: HMM datastructure
+    :param obs: Numpy array containing the observations
+
+    :return logE: log emission probabilities (each row represents a time step)
+    """
+    xp = getattr(hmm, 'xp', np)
+    obs = xp.asarray(obs, dtype=hmm.mu1.dtype)
+    z1 = (obs[0][:,np.newaxis] - hmm.mu1) * hmm.inv_sig1
+    z2 = (obs[1][:,np.newaxis] - hmm.mu2) * hmm.inv_sig2
+    z3 = (obs[2][:,np.newaxis] - hmm.mu3) * hmm.inv_sig3
+    logE = -0.5 * (z1*z1 + z2*z2 + z3*z3)
+    logE += xp.log(hmm.norm1) + xp.log(hmm.norm2) + xp.log(hmm.norm3)
+    return logE
+
+def precompute_emissions(hmm, obs):
+    """
+    Computes the Gaussian emission probabilities for all timesteps in one
+    vectorized pass, replacing the per-timestep calcB calls.
+
+    :param hmm: HMM datastructure
+    :param obs: Numpy array containing the observations
+
+    :return E: emission probabilities (each row represents a time step)
+    """
+    return getattr(hmm, 'xp', np).exp(precompute_log_emissions(hmm, obs))
+
+@njit(cache=True, fastmath=True)
+def _forwardE_numba(pi, AT, E, f, norms):
+    num_states = pi.shape[0]
+    for j in range(num_states):
+        f[0,j] = pi[j]
+    for t in range(E.shape[0]):
+        s = 0.0
+        for j in range(num_states):
+            acc = 0.0
+            for i in range(num_states):
+                acc += AT[j,i] * f[t,i]
+            f[t+1,j] = E[t,j] * acc
+            s += f[t+1,j]
+        norms[t] = s
+        for j in range(num_states):
+            f[t+1,j] /= s
+    return f
+
+@njit(cache=True, fastmath=True)
+def _forwardE_csr_numba(pi, indptr, indices, data, E, f, norms):
+    num_states = pi.shape[0]
+    for j in range(num_states):
+        f[0,j] = pi[j]
+    for t in range(E.shape[0]):
+        s = 0.0
+        for j in range(num_states):
+            acc = 0.0
+            for k in range(indptr[j], indptr[j+1]):
+                acc += data[k] * f[t,indices[k]]
+            f[t+1,j] = E[t,j] * acc
+            s += f[t+1,j]
+        norms[t] = s
+        for j in range(num_states):
+            f[t+1,j] /= s
+    return f
+
+@njit(cache=True, parallel=True, fastmath=True)
+def _forwardE_batch_numba(pi, AT, E, f):
+    num_states = pi.shape[0]
+    # sequences are independent, so the batch is embarrassingly parallel;
+    # pi/AT are shared read-only across threads
+    for n in prange(E.shape[0]):
+        for j in range(num_states):
+            f[n,0,j] = pi[j]
+        for t in range(E.shape[1]):
+            s = 0.0
+            for j in range(num_states):
+                acc = 0.0
+                for i in range(num_states):
+                    acc += AT[j,i] * f[n,t,i]
+                f[n,t+1,j] = E[n,t,j] * acc
+                s += f[n,t+1,j]
+            for j in range(num_states):
+                f[n,t+1,j] /= s
+    return f
+
+@njit(cache=True, fastmath=True)
+def _backwardE_numba(A, E, b):
+    num_states = A.shape[0]
+    T = E.shape[0]
+    for j in range(num_states):
+        b[T,j] = 1.0
+    for t in range(T,0,-1):
+        s = 0.0
+        for i in range(num_states):
+            acc = 0.0
+            for j in range(num_states):
+                acc += A[i,j] * E[t-1,j] * b[t,j]
+            b[t-1,i] = acc
+            s += acc
+        for i in range(num_states):
+            b[t-1,i] /= s
+    return b
+
+@njit(cache=True, parallel=True, fastmath=True)
+def _forward_scan_numba(pi, AT, E, f, num_chunks):
+    T = E.shape[0]
+    num_states = E.shape[1]
+    bounds = np.empty(num_chunks+1, dtype=np.int64)
+    for c in range(num_chunks+1):
+        bounds[c] = c * T // num_chunks
+    # up-sweep: per-chunk products of the step matrices M_t = diag(E[t]) AT,
+    # renormalized to keep them from underflowing
+    P = np.empty((num_chunks, num_states, num_states))
+    for c in prange(num_chunks):
+        Pc = np.eye(num_states)
+        tmp = np.empty((num_states, num_states))
+        for t in range(bounds[c], bounds[c+1]):
+            s = 0.0
+            for j in range(num_states):
+                for k in range(num_states):
+                    acc = 0.0
+                    for i in range(num_states):
+                        acc += AT[j,i] * Pc[i,k]
+                    tmp[j,k] = E[t,j] * acc
+                    s += tmp[j,k]
+            for j in range(num_states):
+                for k in range(num_states):
+                    Pc[j,k] = tmp[j,k] / s
+        P[c] = Pc
+    # sequential combine of the chunk products into the boundary messages
+    vb = np.empty((num_chunks+1, num_states))
+    for j in range(num_states):
+        vb[0,j] = pi[j]
+    for c in range(num_chunks):
+        s = 0.0
+        for j in range(num_states):
+            acc = 0.0
+            for i in range(num_states):
+                acc += P[c,j,i] * vb[c,i]
+            vb[c+1,j] = acc
+            s += acc
+        for j in range(num_states):
+            vb[c+1,j] /= s
+    # down-sweep: fill in each chunk from its boundary message
+    for c in prange(num_chunks):
+        cur = vb[c].copy()
+        nxt = np.empty(num_states)
+        for t in range(bounds[c], bounds[c+1]):
+            s = 0.0
+            for j in range(num_states):
+                acc = 0.0
+                for i in range(num_states):
+                    acc += AT[j,i] * cur[i]
+                nxt[j] = E[t,j] * acc
+                s += nxt[j]
+            for j in range(num_states):
+                cur[j] = nxt[j] / s
+                f[t+1,j] = cur[j]
+    return f
+
+# no fastmath here: zero-probability transitions are -inf in log space and
+# fastmath assumes finite values
+@njit(cache=True)
+def _forward_log_numba(logpi, logA, logE, f):
+    num_states = logpi.shape[0]
+    for j in range(num_states):
+        f[0,j] = logpi[j]
+    for t in range(logE.shape[0]):
+        for j in range(num_states):
+            m = -np.inf
+            for i in range(num_states):
+                val = f[t,i] + logA[i,j]
+                if val > m:
+                    m = val
+            if m == -np.inf:
+                f[t+1,j] = -np.inf
+                continue
+            acc = 0.0
+            for i in range(num_states):
+                acc += np.exp(f[t,i] + logA[i,j] - m)
+            f[t+1,j] = m + np.log(acc) + logE[t,j]
+    return f
+
+@njit(cache=True)
+def _backward_log_numba(logA, logE, b):
+    num_states = logA.shape[0]
+    T = logE.shape[0]
+    for j in range(num_states):
+        b[T,j] = 0.0
+    for t in range(T,0,-1):
+        for i in range(num_states):
+            m = -np.inf
+            for j in range(num_states):
+                val = logA[i,j] + logE[t-1,j] + b[t,j]
+                if val > m:
+                    m = val
+            if m == -np.inf:
+                b[t-1,i] = -np.inf
+                continue
+            acc = 0.0
+            for j in range(num_states):
+                acc += np.exp(logA[i,j] + logE[t-1,j] + b[t,j] - m)
+            b[t-1,i] = m + np.log(acc)
+    return b
+
+# no fastmath here either (see the log forward/backward kernels); the max
+# recurrence needs no per-step normalization in log space, since argmax is
+# preserved and the sums cannot underflow
+@njit(cache=True)
+def _viterbi_log_numba(logpi, logA, logE, vs, bps):
+    num_states = logpi.shape[0]
+    for j in range(num_states):
+        vs[0,j] = logpi[j]
+    for t in range(logE.shape[0]):
+        for j in range(num_states):
+            best = -np.inf
+            arg = 0
+            for i in range(num_states):
+                val = vs[t,i] + logA[i,j]
+                if val > best:
+                    best = val
+                    arg = i
+            vs[t+1,j] = best + logE[t,j]
+            bps[t+1,j] = arg
+    return vs
+
+def forwardHMM(hmm, obs, return_loglik=False):
     """
-    Computes the filtering distribution (forward messages) for a given 
+    Computes the filtering distribution (forward messages) for a given
     Hidden Markov Model and observations.
-    
+
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
+    :param return_loglik: also return the log likelihood of the observations.
+                          The per-step normalizers are accumulated anyway, so
+                          this costs one log per time step and no extra pass
 
     :return f: filtering distribution (each row represents a time step)
-    """ 
+    :return log_lik: log likelihood log P(obs) (only if return_loglik)
+    """
     f = np.zeros((len(obs[0])+1,len(hmm.pi)))
-    f[0] = hmm.pi
-    
-    for t in range(0,len(obs[0])):
-        v = (hmm.B1[obs[0,t]] * hmm.B2[obs[1,t]]*hmm.B3[obs[2,t]]) * np.dot((hmm.A.T),f[t])
-        f[t+1] = v / v.sum()
+    norms = np.empty(len(obs[0]))
+    E = gather_emissions(hmm, obs)
+    if getattr(hmm, 'AT_csr', None) is not None:
+        AT_csr = hmm.AT_csr
+        _forwardE_csr_numba(np.asarray(hmm.pi,dtype=np.double), AT_csr.indptr,
+                            AT_csr.indices, AT_csr.data, np.asarray(E), f, norms)
+    elif _hmm_core is not None:
+        _hmm_core.forwardE(np.asarray(hmm.pi,dtype=np.double),
+                           np.asarray(hmm.AT,dtype=np.double),
+                           np.asarray(E,dtype=np.double), f, norms)
+    else:
+        _forwardE_numba(np.asarray(hmm.pi,dtype=np.double), hmm.AT, np.asarray(E), f, norms)
+    if return_loglik:
+        return f, np.log(norms).sum()
     return f
 
-def forwardHMMG(hmm, obs):
+def forwardHMMG(hmm, obs, return_loglik=False):
     """
-    Computes the filtering distribution (forward messages) for a given 
+    Computes the filtering distribution (forward messages) for a given
     Hidden Markov Model and observations.
-    
+
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
+    :param return_loglik: also return the log likelihood of the observations
+                          (see forwardHMM)
 
     :return f: filtering distribution (each row represents a time step)
-    """ 
+    :return log_lik: log likelihood log P(obs) (only if return_loglik)
+    """
+    if getattr(hmm, 'backend', 'numpy') != 'numpy':
+        return _forwardHMMG_xp(hmm, obs, return_loglik)
+    f = np.zeros((len(obs[0])+1,len(hmm.pi)))
+    norms = np.empty(len(obs[0]))
+    E = precompute_emissions(hmm, obs)
+    if getattr(hmm, 'AT_csr', None) is not None:
+        AT_csr = hmm.AT_csr
+        _forwardE_csr_numba(np.asarray(hmm.pi,dtype=np.double), AT_csr.indptr,
+                            AT_csr.indices, AT_csr.data, E, f, norms)
+    elif _hmm_core is not None:
+        _hmm_core.forwardE(np.asarray(hmm.pi,dtype=np.double),
+                           np.asarray(hmm.AT,dtype=np.double),
+                           np.asarray(E,dtype=np.double), f, norms)
+    else:
+        _forwardE_numba(np.asarray(hmm.pi,dtype=np.double), hmm.AT, E, f, norms)
+    if return_loglik:
+        return f, np.log(norms).sum()
+    return f
+
+def forwardHMM_batch(hmm, obs_list):
+    """
+    Computes the filtering distribution for a batch of independent
+    observation sequences of equal length, running the sequences in
+    parallel across the numba threads. Useful for the E-step of
+    Baum-Welch training, where many sequences are filtered per iteration.
+
+    :param hmm: HMM datastructure
+    :param obs_list: list of observation arrays or 3D array [sequence, 3, time]
+
+    :return f: filtering distributions [sequence, time, state]
+    """
+    obs = np.asarray(obs_list)
+    E = hmm.B1[obs[:,0]] * hmm.B2[obs[:,1]] * hmm.B3[obs[:,2]]
+    f = np.zeros((obs.shape[0], obs.shape[2]+1, len(hmm.pi)))
+    _forwardE_batch_numba(np.asarray(hmm.pi,dtype=np.double),
+                          np.asarray(hmm.AT,dtype=np.double),
+                          np.asarray(E,dtype=np.double), f)
+    return f
+
+def forwardHMMG_batch(hmm, obs_list):
+    """
+    Computes the filtering distribution for a batch of independent
+    continuous observation sequences of equal length, parallel across
+    sequences as in forwardHMM_batch.
+
+    :param hmm: HMM datastructure
+    :param obs_list: list of observation arrays or 3D array [sequence, 3, time]
+
+    :return f: filtering distributions [sequence, time, state]
+    """
+    obs = np.asarray(obs_list)
+    E = np.stack([precompute_emissions(hmm, o) for o in obs])
+    f = np.zeros((obs.shape[0], obs.shape[2]+1, len(hmm.pi)))
+    _forwardE_batch_numba(np.asarray(hmm.pi,dtype=np.double),
+                          np.asarray(hmm.AT,dtype=np.double),
+                          np.asarray(E,dtype=np.double), f)
+    return f
+
+def _forwardHMMG_xp(hmm, obs, return_loglik=False):
+    # backend-agnostic forward pass; the whole emission matrix is built
+    # on-device so the recursion only moves length-N messages around
+    xp = hmm.xp
+    E = precompute_emissions(hmm, obs)
+    rows = [xp.asarray(hmm.pi, dtype=xp.float64)]
+    log_lik = 0.0
+    for t in range(E.shape[0]):
+        v = E[t] * (hmm.AT @ rows[-1])
+        s = v.sum()
+        log_lik += xp.log(s)
+        rows.append(v / s)
+    if return_loglik:
+        return xp.stack(rows), log_lik
+    return xp.stack(rows)
+
+def forwardHMM_scan(hmm, obs, num_chunks=None):
+    """
+    Computes the filtering distribution like forwardHMM, but as a chunked
+    two-pass scan over the per-step transition/emission matrices so the
+    chunks run in parallel. The recursion itself is sequential, but it is
+    associative up to normalization, which allows combining per-chunk
+    matrix products. Worth it for long sequences on multi-core machines;
+    for short sequences forwardHMM is cheaper.
+
+    :param hmm: HMM datastructure
+    :param observations: Numpy array containing the observations
+    :param num_chunks: number of parallel chunks (defaults to the numba thread count)
+
+    :return f: filtering distribution (each row represents a time step)
+    """
+    E = gather_emissions(hmm, obs)
+    if num_chunks is None:
+        num_chunks = get_num_threads()
+    num_chunks = max(1, min(num_chunks, len(obs[0])))
     f = np.zeros((len(obs[0])+1,len(hmm.pi)))
     f[0] = hmm.pi
-    
-    for t in range(0,len(obs[0])):
-        bs = calcB(hmm,obs[:,t])
-        v = bs * np.dot((hmm.A.T),f[t])
-        f[t+1] = v / v.sum()
+    _forward_scan_numba(np.asarray(hmm.pi,dtype=np.double), hmm.AT,
+                        np.asarray(E), f, num_chunks)
+    return f
+
+def forwardHMMG_scan(hmm, obs, num_chunks=None):
+    """
+    Computes the filtering distribution like forwardHMMG, but chunked and
+    parallel as in forwardHMM_scan.
+
+    :param hmm: HMM datastructure
+    :param observations: Numpy array containing the observations
+    :param num_chunks: number of parallel chunks (defaults to the numba thread count)
+
+    :return f: filtering distribution (each row represents a time step)
+    """
+    E = precompute_emissions(hmm, obs)
+    if num_chunks is None:
+        num_chunks = get_num_threads()
+    num_chunks = max(1, min(num_chunks, len(obs[0])))
+    f = np.zeros((len(obs[0])+1,len(hmm.pi)))
+    f[0] = hmm.pi
+    _forward_scan_numba(np.asarray(hmm.pi,dtype=np.double), hmm.AT, E, f, num_chunks)
     return f
 def backwardHMM(hmm, obs):
     """
@@ -90,14 +534,16 @@ def backwardHMM(hmm, obs):
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
 
-    :return b: backward messages (each row represents a time step)
+    :return b: backward messages, normalized per time step (each row
+               represents a time step)
     """
     b = np.zeros((len(obs[0])+1,len(hmm.pi)))
-    b[len(obs[0])] = np.ones(len(hmm.pi)) * 10000000
-
-    for t in reversed(range(1,len(obs[0])+1)):
-        b[t-1] = np.dot(hmm.A, (hmm.B1[obs[0,t-1]] * hmm.B2[obs[1,t-1]] * hmm.B3[obs[2,t-1]]).T * b[t])
-        
+    E = gather_emissions(hmm, obs)
+    if _hmm_core is not None:
+        _hmm_core.backwardE(np.asarray(hmm.A,dtype=np.double),
+                            np.asarray(E,dtype=np.double), b)
+    else:
+        _backwardE_numba(np.asarray(hmm.A), np.asarray(E), b)
     return b
 
 def backwardHMMG(hmm, obs):
@@ -108,17 +554,62 @@ def backwardHMMG(hmm, obs):
     :param hmm: HMM datastructure
     :param observations: Numpy array containing the observations
 
-    :return b: backward messages (each row represents a time step)
+    :return b: backward messages, normalized per time step (each row
+               represents a time step)
     """
+    if getattr(hmm, 'backend', 'numpy') != 'numpy':
+        return _backwardHMMG_xp(hmm, obs)
     b = np.zeros((len(obs[0])+1,len(hmm.pi)))
-    b[len(obs[0])] = np.ones(len(hmm.pi)) * 1000#0000
+    E = precompute_emissions(hmm, obs)
+    if _hmm_core is not None:
+        _hmm_core.backwardE(np.asarray(hmm.A,dtype=np.double),
+                            np.asarray(E,dtype=np.double), b)
+    else:
+        _backwardE_numba(np.asarray(hmm.A), E, b)
+    return b
 
-    for t in reversed(range(1,len(obs[0])+1)):
-#         bs = (hmm.B1[obs[0,t-1]] * hmm.B2[obs[1,t-1]] * hmm.B3[obs[2,t-1]])
-        bs = calcB(hmm,obs[:,t-1])
-        v = np.dot(hmm.A, bs.T * b[t])
-        b[t-1] = v / v.sum()
-        
+def _backwardHMMG_xp(hmm, obs):
+    xp = hmm.xp
+    E = precompute_emissions(hmm, obs)
+    rows = [xp.ones(hmm.num_states, dtype=xp.float64)]
+    for t in reversed(range(E.shape[0])):
+        v = hmm.A @ (E[t] * rows[0])
+        rows.insert(0, v / v.sum())
+    return xp.stack(rows)
+
+def forwardHMM_log(hmm, obs):
+    """
+    Computes the forward messages in log space for a given
+    Hidden Markov Model and continuous observations. Accumulating in
+    log space avoids underflow without the per-step normalization, so the
+    messages stay unnormalized and the log likelihood of the observations
+    is the logsumexp of the last row.
+
+    :param hmm: HMM datastructure
+    :param observations: Numpy array containing the observations
+
+    :return f: log forward messages (each row represents a time step)
+    """
+    f = np.zeros((len(obs[0])+1,len(hmm.pi)))
+    logE = precompute_log_emissions(hmm, obs)
+    with np.errstate(divide='ignore'):
+        _forward_log_numba(np.log(hmm.pi), np.log(hmm.A), logE, f)
+    return f
+
+def backwardHMM_log(hmm, obs):
+    """
+    Computes the backward messages in log space for a given
+    Hidden Markov Model and continuous observations.
+
+    :param hmm: HMM datastructure
+    :param observations: Numpy array containing the observations
+
+    :return b: log backward messages (each row represents a time step)
+    """
+    b = np.zeros((len(obs[0])+1,len(hmm.pi)))
+    logE = precompute_log_emissions(hmm, obs)
+    with np.errstate(divide='ignore'):
+        _backward_log_numba(np.log(hmm.A), logE, b)
     return b
 
 def forward_backwardHMM(hmm, obs):
@@ -168,19 +659,17 @@ def viterbiHMM(hmm, observations):
     :param observations: Numpy array containing the observations
 
     :return path: Numpy array of state ids representing the most probable state sequence
-    :return v: Viterbi messages/variables
+    :return v: Viterbi messages/variables (in log space)
     """
     num_frames = observations.shape[1]
     # viterbi variable
     vs = np.empty((num_frames + 1, hmm.num_states))
     # best precursor state
-    bps = np.empty_like(vs, dtype=int)
-    vs[0] = hmm.pi
-    for v_prev, v, bp, obs in zip(vs[:-1], vs[1:], bps[1:], observations.T):
-        tmp = v_prev[:,np.newaxis] * hmm.A * hmm.B1[obs[0]] * hmm.B2[obs[1]] * hmm.B3[obs[2]]
-        bp[:] = tmp.argmax(0)
-        v[:] = tmp.max(0)
-        v /= v.sum()
+    bps = np.zeros_like(vs, dtype=np.int64)
+    E = gather_emissions(hmm, observations)
+    with np.errstate(divide='ignore'):
+        _viterbi_log_numba(np.log(hmm.pi), np.log(hmm.A),
+                           np.log(np.asarray(E,dtype=np.double)), vs, bps)
 
     path = np.empty(num_frames + 1, dtype=int)
     path[-1] = vs[-1].argmax()
@@ -198,21 +687,17 @@ def viterbiHMMG(hmm, observations):
     :param observations: Numpy array containing the observations
 
     :return path: Numpy array of state ids representing the most probable state sequence
-    :return v: Viterbi messages/variables
+    :return v: Viterbi messages/variables (in log space)
     """
     num_frames = observations.shape[1]
     # viterbi variable
     vs = np.empty((num_frames + 1, hmm.num_states))
     # best precursor state
-    bps = np.empty_like(vs, dtype=int)
-    vs[0] = hmm.pi
-    for v_prev, v, bp, obs in zip(vs[:-1], vs[1:], bps[1:], observations.T):
-#         bs = hmm.B1[obs[0]] * hmm.B2[obs[1]] * hmm.B3[obs[2]]
-        bs = calcB(hmm,obs)
-        tmp = v_prev[:,np.newaxis] * hmm.A * bs
-        bp[:] = tmp.argmax(0)
-        v[:] = tmp.max(0)
-        v /= v.sum()
+    bps = np.zeros_like(vs, dtype=np.int64)
+    logE = precompute_log_emissions(hmm, observations)
+    with np.errstate(divide='ignore'):
+        _viterbi_log_numba(np.log(hmm.pi), np.log(hmm.A),
+                           np.asarray(logE,dtype=np.double), vs, bps)
 
     path = np.empty(num_frames + 1, dtype=int)
     path[-1] = vs[-1].argmax()
@@ -235,14 +720,22 @@ def generate_sequence(hmm, len_sequence):
     """
     hidden_state_sequence = np.empty(len_sequence + 1, dtype=int)
     observations = np.empty((3, len_sequence), dtype=int)
+    # precompute the CDFs once and draw all uniforms in one call instead of
+    # recomputing a cumsum per sample() invocation
+    Acdf = hmm.A.cumsum(1)
+    B1cdf = hmm.B1.cumsum(0)
+    B2cdf = hmm.B2.cumsum(0)
+    B3cdf = hmm.B3.cumsum(0)
+    U = np.random.random((4, len_sequence))
     hidden_state_sequence[0] = sample(hmm.pi)
     for i in range(len_sequence):
-        hidden_state_sequence[i+1] = sample(hmm.A[hidden_state_sequence[i], :])
-        observations[0, i] = sample(hmm.B1[:, hidden_state_sequence[i+1]])
-        observations[1, i] = sample(hmm.B2[:, hidden_state_sequence[i+1]])
-        observations[2, i] = sample(hmm.B3[:, hidden_state_sequence[i+1]])
+        s = Acdf[hidden_state_sequence[i]].searchsorted(U[0, i])
+        hidden_state_sequence[i+1] = s
+        observations[0, i] = B1cdf[:, s].searchsorted(U[1, i])
+        observations[1, i] = B2cdf[:, s].searchsorted(U[2, i])
+        observations[2, i] = B3cdf[:, s].searchsorted(U[3, i])
     return hidden_state_sequence, observations
-    
+
 
 def generate_sequenceG(hmm, len_sequence):
     """
@@ -258,10 +751,38 @@ def generate_sequenceG(hmm, len_sequence):
     """
     hidden_state_sequence = np.empty(len_sequence + 1, dtype=int)
     observations = np.empty((3, len_sequence), dtype=int)
+    Acdf = hmm.A.cumsum(1)
+    U = np.random.random(len_sequence)
     hidden_state_sequence[0] = sample(hmm.pi)
     for i in range(len_sequence):
-        hidden_state_sequence[i+1] = sample(hmm.A[hidden_state_sequence[i], :])
-        observations[0, i] = sampleG(hmm.B1[:, hidden_state_sequence[i+1]])
-        observations[1, i] = sampleG(hmm.B2[:, hidden_state_sequence[i+1]])
-        observations[2, i] = sampleG(hmm.B3[:, hidden_state_sequence[i+1]])
+        hidden_state_sequence[i+1] = Acdf[hidden_state_sequence[i]].searchsorted(U[i])
+    # with the hidden chain fixed the Gaussian draws are independent and can
+    # be taken in one vectorized call per channel
+    states = hidden_state_sequence[1:]
+    observations[0] = np.random.normal(hmm.B1[0, states], hmm.B1[1, states])
+    observations[1] = np.random.normal(hmm.B2[0, states], hmm.B2[1, states])
+    observations[2] = np.random.normal(hmm.B3[0, states], hmm.B3[1, states])
     return hidden_state_sequence, observations
+
+
+def _warmup():
+    """
+    Triggers compilation of the numba kernels with a dummy call at import time
+    so the first real inference call does not pay the compilation cost.
+    """
+    pi = np.ones(1)
+    A = np.ones((1,1))
+    E = np.ones((1,1))
+    _forwardE_numba(pi, A, E, np.zeros((2,1)), np.zeros(1))
+    idx = np.zeros(1, dtype=np.int32)
+    _forwardE_csr_numba(pi, np.array([0,1], dtype=np.int32), idx, np.ones(1), E,
+                        np.zeros((2,1)), np.zeros(1))
+    _backwardE_numba(A, E, np.zeros((2,1)))
+    _forward_log_numba(np.log(pi), np.log(A), E, np.zeros((2,1)))
+    _backward_log_numba(np.log(A), E, np.zeros((2,1)))
+    bp = np.zeros((2,1), dtype=np.int64)
+    _viterbi_log_numba(np.log(pi), np.log(A), E, np.zeros((2,1)), bp)
+    _forward_scan_numba(pi, A, E, np.zeros((2,1)), 1)
+    _forwardE_batch_numba(pi, A, np.ones((1,1,1)), np.zeros((1,2,1)))
+
+_warmup()
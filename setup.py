@@ -30,6 +30,8 @@ setup(
   tests_require=['pytest'],
   install_requires=['cythonize',
                      'numpy',
+                     'numba',
+                     'scipy',
                      ],
   cmdclass={'test': PyTest},
   author_email='napster2202@gmail.com',
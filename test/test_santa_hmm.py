@@ -0,0 +1,233 @@
+from itertools import product
+import numpy as np
+from numpy import array
+
+import santa_hmm
+
+
+def brute_force_filtering(hmm, obs):
+    """
+    Computes the filtering distribution by enumerating all state sequences.
+    Only feasible for tiny models/sequences, used as a reference.
+    """
+    num_frames = obs.shape[1]
+    f = np.zeros((num_frames + 1, hmm.num_states))
+    f[0] = hmm.pi
+    for t in range(1, num_frames + 1):
+        for states in product(range(hmm.num_states), repeat=t + 1):
+            p = hmm.pi[states[0]]
+            for i in range(t):
+                p *= hmm.A[states[i], states[i+1]]
+                p *= hmm.B1[obs[0, i], states[i+1]] * hmm.B2[obs[1, i], states[i+1]] * hmm.B3[obs[2, i], states[i+1]]
+            f[t, states[t]] += p
+        f[t] /= f[t].sum()
+    return f
+
+
+def reference_filtering(hmm, obs):
+    """
+    Computes the filtering distribution with a plain numpy recursion,
+    independent of the compiled kernels. Usable for long sequences where
+    brute-force enumeration is infeasible.
+    """
+    num_frames = obs.shape[1]
+    f = np.zeros((num_frames + 1, hmm.num_states))
+    f[0] = hmm.pi
+    for t in range(num_frames):
+        e = hmm.B1[obs[0, t]] * hmm.B2[obs[1, t]] * hmm.B3[obs[2, t]]
+        v = e * (hmm.A.T @ f[t])
+        f[t+1] = v / v.sum()
+    return f
+
+
+def brute_force_smoothing(hmm, obs):
+    """
+    Computes the smoothing distribution by enumerating all state sequences.
+    """
+    num_frames = obs.shape[1]
+    post = np.zeros((num_frames + 1, hmm.num_states))
+    for states in product(range(hmm.num_states), repeat=num_frames + 1):
+        p = hmm.pi[states[0]]
+        for i in range(num_frames):
+            p *= hmm.A[states[i], states[i+1]]
+            p *= hmm.B1[obs[0, i], states[i+1]] * hmm.B2[obs[1, i], states[i+1]] * hmm.B3[obs[2, i], states[i+1]]
+        for t in range(num_frames + 1):
+            post[t, states[t]] += p
+    post = post / post.sum(1)[:, np.newaxis]
+    return post
+
+
+def brute_force_viterbi(hmm, obs):
+    """
+    Finds the most probable state sequence by enumerating all state sequences.
+    """
+    num_frames = obs.shape[1]
+    best_p = -1.0
+    best_path = None
+    for states in product(range(hmm.num_states), repeat=num_frames + 1):
+        p = hmm.pi[states[0]]
+        for i in range(num_frames):
+            p *= hmm.A[states[i], states[i+1]]
+            p *= hmm.B1[obs[0, i], states[i+1]] * hmm.B2[obs[1, i], states[i+1]] * hmm.B3[obs[2, i], states[i+1]]
+        if p > best_p:
+            best_p = p
+            best_path = np.array(states)
+    return best_path
+
+
+class TestSantaHMM(object):
+    """Tests the HMM inference routines of santa_hmm against brute-force
+    enumeration on the santa model from the documentation."""
+    def setup_method(self, _):
+        pi = array([1.0, 0, 0, 0])
+
+        # hidden states: 0 = absent, 1 = sleigh, 2 = chimney, 3 = christmas tree
+        A = array([[0.8, 0.2, 0.0, 0.0],
+                   [0.2, 0.6, 0.2, 0.0],
+                   [0.0, 0.4, 0.2, 0.4],
+                   [0.0, 0.0, 0.4, 0.6]])
+
+        # observation probabilites: noise (0 = silence, 1 = rumbling, 2 = crackle)
+        B1 = array([[0.9,  0.1, 0.0, 0.2],
+                    [0.05, 0.4, 1.0, 0.1],
+                    [0.05, 0.5, 0.0, 0.7]])
+        # observation probabilities: light (0 = bright light, 1 = dimmed light, 2 = dark)
+        B2 = array([[0.1, 0.1, 0.0, 0.4],
+                    [0.1, 0.3, 0.1, 0.4],
+                    [0.8, 0.6, 0.9, 0.2]])
+        # observation probabilities: smell (0 = cinnamon, 1 = popcorn, 2 = no particular smell)
+        B3 = array([[0.2, 0.2, 0.2, 0.2],
+                    [0.1, 0.1, 0.1, 0.1],
+                    [0.7, 0.7, 0.7, 0.7]])
+
+        self.hmm = santa_hmm.HMM(pi, A, B1, B2, B3)
+        self.obs = np.array([[1, 2, 1, 0, 2],
+                             [2, 1, 2, 2, 1],
+                             [2, 2, 0, 2, 1]])
+
+    def test_forward(self):
+        f = santa_hmm.forwardHMM(self.hmm, self.obs)
+        ref = brute_force_filtering(self.hmm, self.obs)
+        assert np.all(np.abs(f - ref) <= 0.00001)
+
+    def test_forward_backward(self):
+        post = santa_hmm.forward_backwardHMM(self.hmm, self.obs)
+        ref = brute_force_smoothing(self.hmm, self.obs)
+        assert np.all(np.abs(post[1:] - ref[1:]) <= 0.00001)
+
+    def test_forward_long(self):
+        np.random.seed(7)
+        obs = np.random.randint(0, 3, (3, 200))
+        f = santa_hmm.forwardHMM(self.hmm, obs)
+        ref = reference_filtering(self.hmm, obs)
+        assert np.all(np.abs(f - ref) <= 0.00001)
+
+    def test_forward_sparse(self):
+        # left-to-right chain over 24 states: two transitions per row is
+        # well below the 10% density cutoff, so the CSR kernels kick in
+        np.random.seed(13)
+        num_states = 24
+        A = np.zeros((num_states, num_states))
+        for i in range(num_states):
+            A[i, i] = 0.5
+            A[i, (i + 1) % num_states] = 0.5
+        pi = np.full(num_states, 1.0 / num_states)
+        B1 = np.random.dirichlet(np.ones(3), num_states).T
+        B2 = np.random.dirichlet(np.ones(3), num_states).T
+        B3 = np.random.dirichlet(np.ones(3), num_states).T
+        hmm = santa_hmm.HMM(pi, A, B1, B2, B3)
+        assert hmm.AT_csr is not None
+        obs = np.random.randint(0, 3, (3, 50))
+        f = santa_hmm.forwardHMM(hmm, obs)
+        ref = reference_filtering(hmm, obs)
+        assert np.all(np.abs(f - ref) <= 0.00001)
+
+    def test_forward_scan(self):
+        np.random.seed(11)
+        obs = np.random.randint(0, 3, (3, 120))
+        f = santa_hmm.forwardHMM(self.hmm, obs)
+        fscan = santa_hmm.forwardHMM_scan(self.hmm, obs, num_chunks=3)
+        assert np.all(np.abs(f - fscan) <= 0.00001)
+
+    def test_forward_batch(self):
+        np.random.seed(17)
+        obs_list = [np.random.randint(0, 3, (3, 30)) for _ in range(4)]
+        fb = santa_hmm.forwardHMM_batch(self.hmm, obs_list)
+        for i, obs in enumerate(obs_list):
+            f = santa_hmm.forwardHMM(self.hmm, obs)
+            assert np.all(np.abs(fb[i] - f) <= 0.00001)
+
+    def test_forward_loglik(self):
+        f, log_lik = santa_hmm.forwardHMM(self.hmm, self.obs, return_loglik=True)
+        assert np.all(np.abs(f - santa_hmm.forwardHMM(self.hmm, self.obs)) <= 0.00001)
+        num_frames = self.obs.shape[1]
+        total = 0.0
+        for states in product(range(self.hmm.num_states), repeat=num_frames + 1):
+            p = self.hmm.pi[states[0]]
+            for i in range(num_frames):
+                p *= self.hmm.A[states[i], states[i+1]]
+                p *= (self.hmm.B1[self.obs[0, i], states[i+1]]
+                      * self.hmm.B2[self.obs[1, i], states[i+1]]
+                      * self.hmm.B3[self.obs[2, i], states[i+1]])
+            total += p
+        assert abs(log_lik - np.log(total)) <= 0.00001
+
+    def test_viterbi(self):
+        path, _ = santa_hmm.viterbiHMM(self.hmm, self.obs)
+        ref = brute_force_viterbi(self.hmm, self.obs)
+        assert np.all(path == ref)
+
+    def test_float32_storage(self):
+        hmm32 = santa_hmm.HMM(self.hmm.pi, self.hmm.A, self.hmm.B1, self.hmm.B2,
+                              self.hmm.B3, dtype=np.float32)
+        assert hmm32.A.dtype == np.float32
+        f64 = santa_hmm.forwardHMM(self.hmm, self.obs)
+        f32 = santa_hmm.forwardHMM(hmm32, self.obs)
+        assert np.all(np.abs(f64 - f32) <= 0.0001)
+
+
+class TestSantaHMMG(object):
+    """Tests the continuous-observation (Gaussian) inference routines."""
+    def setup_method(self, _):
+        pi = array([0.4, 0.3, 0.2, 0.1])
+
+        A = array([[0.8, 0.2, 0.0, 0.0],
+                   [0.2, 0.6, 0.2, 0.0],
+                   [0.0, 0.4, 0.2, 0.4],
+                   [0.0, 0.0, 0.4, 0.6]])
+
+        B1G = array([[1.0, 2.0, 3.0, 4.0],
+                     [0.5, 0.5, 0.5, 0.5]])
+        B2G = array([[1.0, 2.0, 3.0, 4.0],
+                     [0.5, 0.5, 0.5, 0.5]])
+        B3G = array([[1.0, 2.0, 3.0, 4.0],
+                     [0.5, 0.5, 0.5, 0.5]])
+
+        self.hmm = santa_hmm.HMM(pi, A, B1G, B2G, B3G)
+        np.random.seed(42)
+        self.obs = np.random.randn(3, 30) + 2.5
+
+    def test_calcB_shape(self):
+        bs = santa_hmm.calcB(self.hmm, self.obs[:, 0])
+        assert bs.shape == (self.hmm.num_states,)
+        assert np.all(np.abs(bs - santa_hmm.precompute_emissions(self.hmm, self.obs)[0]) <= 0.00001)
+
+    def test_forward_log(self):
+        f = santa_hmm.forwardHMMG(self.hmm, self.obs)
+        flog = santa_hmm.forwardHMM_log(self.hmm, self.obs)
+        fnorm = np.exp(flog) / np.exp(flog).sum(1)[:, np.newaxis]
+        assert np.all(np.abs(f - fnorm) <= 0.00001)
+
+    def test_forward_loglik(self):
+        _, log_lik = santa_hmm.forwardHMMG(self.hmm, self.obs, return_loglik=True)
+        flog = santa_hmm.forwardHMM_log(self.hmm, self.obs)
+        m = flog[-1].max()
+        ref = m + np.log(np.exp(flog[-1] - m).sum())
+        assert abs(log_lik - ref) <= 0.00001
+
+    def test_forward_backward_log(self):
+        post = santa_hmm.forward_backwardHMMG(self.hmm, self.obs)
+        lpost = santa_hmm.forwardHMM_log(self.hmm, self.obs) + santa_hmm.backwardHMM_log(self.hmm, self.obs)
+        lpost = np.exp(lpost - lpost.max(1)[:, np.newaxis])
+        lpost = lpost / lpost.sum(1)[:, np.newaxis]
+        assert np.all(np.abs(post - lpost) <= 0.00001)